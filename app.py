@@ -1,12 +1,19 @@
 from flask import Flask, request, jsonify, send_from_directory
 from flask_cors import CORS
+import copy
 import json
 import os
 import re
+import tempfile
+import threading
+import time
+from functools import wraps
 from datetime import datetime
 import zipfile
 import xml.etree.ElementTree as ET
 
+import history
+
 # Essayer d'importer odfpy pour une meilleure extraction
 try:
     from odf.opendocument import load
@@ -21,6 +28,8 @@ CORS(app)  # Permettre les requêtes cross-origin
 
 # Configuration
 JSON_FILE_PATH = 'ifsi_courses_2025-09-23.json'
+REPLACE_RETRIES = 10  # Windows refuse de remplacer un fichier ouvert ailleurs (lecture en cours)
+REPLACE_RETRY_DELAY = 0.05
 
 def read_json_file():
     """Lit le fichier JSON existant"""
@@ -60,8 +69,104 @@ def read_json_file():
 
 def write_json_file(data):
     """Écrit les données dans le fichier JSON"""
-    with open(JSON_FILE_PATH, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    # Écriture via un fichier temporaire : un arrêt brutal ne laisse jamais un JSON tronqué
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(JSON_FILE_PATH)),
+                                     prefix='temp_', suffix='.json')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        for attempt in range(REPLACE_RETRIES):
+            try:
+                os.replace(temp_path, JSON_FILE_PATH)
+                break
+            except PermissionError:
+                # Le fichier est peut-être en cours de lecture (page servie en parallèle)
+                if attempt == REPLACE_RETRIES - 1:
+                    raise
+                time.sleep(REPLACE_RETRY_DELAY)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    index_store(data)
+
+# Cache mémoire du fichier JSON, indexé au démarrage puis à chaque écriture.
+# Le dictionnaire est remplacé d'un bloc (jamais modifié sur place) : les lectures
+# se font sans verrou, seules les écritures et les rechargements prennent store_lock.
+store_lock = threading.RLock()
+_store = {'data': None, 'mtime': None, 'stats': None}
+_writes_stopped = threading.Event()
+
+def _json_mtime():
+    try:
+        return os.path.getmtime(JSON_FILE_PATH)
+    except OSError:
+        return None
+
+def index_store(data):
+    """Met à jour le cache mémoire et les statistiques précalculées"""
+    global _store
+    with store_lock:
+        _store = {
+            'data': data,
+            'mtime': _json_mtime(),
+            'stats': {
+                'totalCourses': len(data['courses']),
+                'totalTerms': sum(len(course[1]['definitions']) for course in data['courses']),
+                'studiedTerms': data['stats'].get('studiedTerms', 0),
+                'correctAnswers': data['stats'].get('correctAnswers', 0)
+            }
+        }
+
+def preload_store():
+    """Charge et indexe le fichier JSON (appelé avant d'accepter des requêtes)"""
+    with store_lock:
+        index_store(read_json_file())
+        return _store
+
+def get_store():
+    """Retourne le cache, rechargé si le fichier a été modifié hors de l'application"""
+    store = _store
+    if store['data'] is not None and store['mtime'] == _json_mtime():
+        return store
+    with store_lock:
+        # Un autre thread a peut-être rechargé le cache pendant l'attente du verrou
+        if _store['data'] is None or _store['mtime'] != _json_mtime():
+            preload_store()
+        return _store
+
+def read_store_copy():
+    """Copie modifiable du cache (le dictionnaire en cache est partagé entre les requêtes)"""
+    with store_lock:
+        return copy.deepcopy(get_store()['data'])
+
+def reset_store():
+    """Vide le cache (il sera rechargé au prochain accès)"""
+    global _store
+    with store_lock:
+        _store = {'data': None, 'mtime': None, 'stats': None}
+
+def is_store_ready():
+    """Indique si le cache a été chargé"""
+    return _store['data'] is not None
+
+def with_store_lock(func):
+    """Sérialise les lectures-modifications-écritures du fichier JSON entre threads"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        with store_lock:
+            if _writes_stopped.is_set():
+                return jsonify({'error': 'Serveur en cours d\'arrêt'}), 503
+            return func(*args, **kwargs)
+    return wrapper
+
+def stop_writes():
+    """Refuse les nouvelles écritures et attend la fin de celle en cours.
+
+    Le verrou reste acquis par le thread appelant : aucune écriture ne peut
+    plus commencer, même si des threads de requêtes sont encore vivants.
+    """
+    _writes_stopped.set()
+    store_lock.acquire()
 
 def extract_text_from_odt(file_path):
     """Extrait le texte d'un fichier ODT en préservant la structure"""
@@ -447,6 +552,16 @@ def generate_course_key(metadata):
     
     return f"ue_{ue}_{title}"
 
+def record_history(json_data, message):
+    """Enregistre une version dans l'historique sans faire échouer la requête en cours"""
+    try:
+        return history.record_version(json_data, message)
+    except Exception as e:
+        print(f"Erreur lors de l'enregistrement de l'historique: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
 @app.route('/')
 def index():
     """Sert la page principale"""
@@ -461,21 +576,32 @@ def serve_static(filename):
 def get_stats():
     """Retourne les statistiques actuelles"""
     try:
-        data = read_json_file()
-        total_courses = len(data['courses'])
-        total_terms = sum(len(course[1]['definitions']) for course in data['courses'])
-        
-        stats = {
-            'totalCourses': total_courses,
-            'totalTerms': total_terms,
-            'studiedTerms': data['stats'].get('studiedTerms', 0),
-            'correctAnswers': data['stats'].get('correctAnswers', 0)
-        }
-        
-        return jsonify(stats)
+        return jsonify(get_store()['stats'])
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/health')
+def health():
+    """Sonde de vie : le processus répond"""
+    return jsonify({'status': 'ok'})
+
+@app.route('/api/ready')
+def ready():
+    """Sonde de disponibilité : le fichier JSON est chargé et indexé"""
+    if not is_store_ready():
+        # Lancer le chargement si personne ne l'a fait (application servie sans serve.py)
+        if not store_lock.acquire(blocking=False):
+            return jsonify({'status': 'loading'}), 503
+        try:
+            if not is_store_ready():
+                preload_store()
+        except Exception as e:
+            print(f"Erreur lors du chargement du fichier JSON: {e}")
+            return jsonify({'status': 'error', 'error': str(e)}), 503
+        finally:
+            store_lock.release()
+    return jsonify({'status': 'ready', 'totalCourses': _store['stats']['totalCourses']})
+
 @app.route('/api/test')
 def test_endpoint():
     """Endpoint de test pour vérifier que le serveur fonctionne"""
@@ -499,8 +625,9 @@ def extract_odt():
         if not file.filename.lower().endswith('.odt'):
             return jsonify({'error': 'Seuls les fichiers .odt sont acceptés'}), 400
         
-        # Sauvegarder temporairement le fichier
-        temp_path = f"temp_{file.filename}"
+        # Sauvegarder temporairement le fichier (nom unique : plusieurs uploads peuvent être simultanés)
+        fd, temp_path = tempfile.mkstemp(prefix='temp_', suffix='.odt')
+        os.close(fd)
         file.save(temp_path)
         
         try:
@@ -536,6 +663,7 @@ def extract_odt():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/add_course', methods=['POST'])
+@with_store_lock
 def add_course():
     """Ajoute un nouveau cours au fichier JSON"""
     try:
@@ -544,8 +672,8 @@ def add_course():
         if not data or 'metadata' not in data or 'definitions' not in data:
             return jsonify({'error': 'Données invalides'}), 400
         
-        # Lire le fichier JSON existant
-        json_data = read_json_file()
+        # Copie du contenu actuel (cache mémoire, rechargé si le fichier a changé)
+        json_data = read_store_copy()
         
         # Générer la clé du cours
         course_key = generate_course_key(data['metadata'])
@@ -593,6 +721,8 @@ def add_course():
                 'action_required': 'confirm_update'
             }), 409  # Conflict status code
         
+        record_history(json_data, 'État avant ajout')
+        
         # Créer l'entrée du cours
         course_entry = {
             'title': course_title,
@@ -613,10 +743,12 @@ def add_course():
         
         # Sauvegarder le fichier JSON
         write_json_file(json_data)
+        version = record_history(json_data, f"Ajout : {course_title}")
         
         return jsonify({
             'success': True,
             'message': 'Cours ajouté avec succès',
+            'version': version,
             'courseKey': course_key,
             'totalTerms': total_terms,
             'totalCourses': len(json_data['courses'])
@@ -629,6 +761,7 @@ def add_course():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/update_course', methods=['POST'])
+@with_store_lock
 def update_course():
     """Met à jour un cours existant"""
     try:
@@ -637,8 +770,8 @@ def update_course():
         if not data or 'metadata' not in data or 'definitions' not in data:
             return jsonify({'error': 'Données invalides'}), 400
         
-        # Lire le fichier JSON existant
-        json_data = read_json_file()
+        # Copie du contenu actuel (cache mémoire, rechargé si le fichier a changé)
+        json_data = read_store_copy()
         
         # Générer la clé du cours
         course_key = generate_course_key(data['metadata'])
@@ -658,6 +791,8 @@ def update_course():
         if existing_course_index is None:
             return jsonify({'error': 'Cours non trouvé pour mise à jour'}), 404
         
+        record_history(json_data, 'État avant mise à jour')
+        
         # Mettre à jour le cours
         course_entry = {
             'title': course_title,
@@ -677,10 +812,12 @@ def update_course():
         
         # Sauvegarder le fichier JSON
         write_json_file(json_data)
+        version = record_history(json_data, f"Mise à jour : {course_title}")
         
         return jsonify({
             'success': True,
             'message': 'Cours mis à jour avec succès',
+            'version': version,
             'courseKey': course_key,
             'totalTerms': total_terms,
             'totalCourses': len(json_data['courses'])
@@ -692,7 +829,103 @@ def update_course():
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/history')
+def list_history():
+    """Liste les versions enregistrées du corpus (la plus récente en premier)"""
+    try:
+        return jsonify({'versions': list(reversed(history.read_log()))})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/history/diff')
+def diff_history():
+    """Compare deux versions du corpus (paramètres from et to : numéros de version)"""
+    try:
+        old_entry = history.resolve_version(request.args.get('from'))
+        new_entry = history.resolve_version(request.args.get('to'))
+        if old_entry is None or new_entry is None:
+            return jsonify({'error': 'Version inconnue'}), 404
+        
+        return jsonify(history.diff_versions(old_entry, new_entry))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/history/course/<course_key>')
+def get_course_history(course_key):
+    """Liste les versions successives d'un cours"""
+    try:
+        versions = history.course_history(course_key)
+        if not versions:
+            return jsonify({'error': 'Aucun historique pour ce cours'}), 404
+        
+        return jsonify({'courseKey': course_key, 'versions': list(reversed(versions))})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/history/restore', methods=['POST'])
+@with_store_lock
+def restore_course():
+    """Restaure un cours tel qu'il était dans une version donnée du corpus"""
+    try:
+        data = request.get_json()
+        
+        if not data or 'courseKey' not in data or 'version' not in data:
+            return jsonify({'error': 'Données invalides'}), 400
+        
+        course_key = data['courseKey']
+        version_entry = history.resolve_version(data['version'])
+        if version_entry is None:
+            return jsonify({'error': 'Version inconnue'}), 404
+        
+        course_hash = history.get_manifest(version_entry['manifest']).get(course_key)
+        if course_hash is None:
+            return jsonify({'error': 'Cours absent de cette version'}), 404
+        
+        json_data = read_store_copy()
+        record_history(json_data, 'État avant restauration')
+        course_entry = history.load_course(course_hash)
+        
+        # Remplacer le cours s'il existe encore (même critère que update_course :
+        # la clé change avec l'UE ou le titre), sinon le rajouter
+        course_title = course_entry.get('title', '').strip()
+        for i, course in enumerate(json_data['courses']):
+            existing_key = course[0]
+            existing_title = course[1].get('title', '').strip()
+            
+            if (existing_key == course_key or existing_title == course_title):
+                json_data['courses'][i] = [course_key, course_entry]
+                break
+        else:
+            json_data['courses'].append([course_key, course_entry])
+        
+        # Mettre à jour les statistiques
+        total_terms = sum(len(course[1]['definitions']) for course in json_data['courses'])
+        json_data['stats']['totalTerms'] = total_terms
+        json_data['exportDate'] = datetime.now().isoformat()
+        
+        # Sauvegarder le fichier JSON
+        write_json_file(json_data)
+        version = record_history(
+            json_data, f"Restauration : {course_entry['title']} (version {version_entry['version']})")
+        
+        return jsonify({
+            'success': True,
+            'message': 'Cours restauré avec succès',
+            'courseKey': course_key,
+            'version': version,
+            'totalTerms': total_terms,
+            'totalCourses': len(json_data['courses'])
+        })
+        
+    except Exception as e:
+        print(f"Erreur dans restore_course: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
 if __name__ == '__main__':
     print("🚀 Serveur IFSI Lannion démarré sur http://localhost:5000")
     print("📁 Fichier JSON:", JSON_FILE_PATH)
+    print("🕓 Historique:", history.HISTORY_DIR)
+    preload_store()
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
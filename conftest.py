@@ -0,0 +1,28 @@
+import json
+import os
+
+import pytest
+
+import app
+import history
+
+JSON_FILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ifsi_courses_2025-09-23.json')
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    monkeypatch.setattr(history, 'HISTORY_DIR', str(tmp_path / 'historique'))
+    with open(JSON_FILE_PATH, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    json_path = tmp_path / 'courses.json'
+    with open(JSON_FILE_PATH, 'r', encoding='utf-8') as f:
+        json_path.write_text(f.read(), encoding='utf-8')
+    monkeypatch.setattr(app, 'JSON_FILE_PATH', str(json_path))
+    monkeypatch.setattr(history, 'HISTORY_DIR', str(tmp_path / 'historique'))
+    app.preload_store()
+    yield app.app.test_client()
+    app.reset_store()
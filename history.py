@@ -0,0 +1,309 @@
+"""Historique des versions du corpus de cours, adressé par contenu.
+
+Chaque définition est stockée une seule fois sous le hash SHA-256 de son
+contenu. Une version de cours est la liste des hash de ses définitions
+(plus ses métadonnées), et une version du corpus est un manifeste
+associant chaque clé de cours au hash de sa version. Le stockage ne
+grandit donc qu'avec les définitions réellement modifiées.
+
+Organisation sur disque :
+
+    historique/
+    ├── objects.pack   # une ligne par objet : "<hash> <json>" (ajout seulement)
+    └── log.json       # versions numérotées du corpus, chacune pointant vers un manifeste
+
+Les objets (définitions, cours, manifestes) sont ajoutés à la fin d'un seul
+fichier ; un index mémoire {hash: position} est reconstruit en le relisant.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime
+
+# Configuration
+HISTORY_DIR = 'historique'
+
+# Verrou des écritures (le serveur peut traiter plusieurs requêtes à la fois)
+_lock = threading.RLock()
+
+# Index mémoire du pack : {hash: (position, longueur)} et fin de la dernière ligne complète
+_pack_index = {'path': None, 'end': 0, 'offsets': {}}
+
+HASH_LENGTH = 64
+
+
+def _canonical(obj):
+    """Sérialisation stable utilisée pour le calcul des hash"""
+    return json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+
+
+def _pack_path():
+    return os.path.join(HISTORY_DIR, 'objects.pack')
+
+
+def _log_path():
+    return os.path.join(HISTORY_DIR, 'log.json')
+
+
+def _write_atomic(path, text):
+    """Écrit un fichier via un fichier temporaire pour ne jamais laisser d'état partiel"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(temp_path, path)
+
+
+def reset_index():
+    """Oublie l'index mémoire du pack (il sera reconstruit à la prochaine lecture)"""
+    with _lock:
+        _pack_index.update(path=None, end=0, offsets={})
+
+
+def _load_pack_index():
+    """Complète l'index du pack avec les lignes ajoutées depuis la dernière lecture"""
+    path = _pack_path()
+    if _pack_index['path'] != path:
+        _pack_index.update(path=path, end=0, offsets={})
+
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        size = 0
+    if size < _pack_index['end']:
+        # Pack remplacé ou tronqué hors de l'application : tout relire
+        _pack_index.update(end=0, offsets={})
+    if size == _pack_index['end']:
+        return _pack_index
+
+    with open(path, 'rb') as f:
+        f.seek(_pack_index['end'])
+        position = _pack_index['end']
+        for line in f:
+            if not line.endswith(b'\n'):
+                break  # dernière ligne incomplète (écriture interrompue) : ignorée et écrasée
+            obj_hash = line[:HASH_LENGTH].decode('ascii')
+            _pack_index['offsets'][obj_hash] = (position + HASH_LENGTH + 1, len(line) - HASH_LENGTH - 2)
+            position += len(line)
+        _pack_index['end'] = position
+    return _pack_index
+
+
+def put_object(obj):
+    """Stocke un objet sous son hash et retourne ce hash (sans le réécrire s'il existe déjà)"""
+    text = _canonical(obj)
+    obj_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    with _lock:
+        index = _load_pack_index()
+        if obj_hash in index['offsets']:
+            return obj_hash
+
+        os.makedirs(HISTORY_DIR, exist_ok=True)
+        path = _pack_path()
+        line = f"{obj_hash} {text}\n".encode('utf-8')
+        with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+            f.seek(index['end'])
+            f.write(line)
+            f.truncate()
+        index['offsets'][obj_hash] = (index['end'] + HASH_LENGTH + 1, len(line) - HASH_LENGTH - 2)
+        index['end'] += len(line)
+    return obj_hash
+
+
+def get_object(obj_hash):
+    """Lit un objet à partir de son hash"""
+    with _lock:
+        position, length = _load_pack_index()['offsets'][obj_hash]
+        with open(_pack_path(), 'rb') as f:
+            f.seek(position)
+            return json.loads(f.read(length).decode('utf-8'))
+
+
+def read_log():
+    """Retourne la liste ordonnée des versions du corpus (la plus ancienne en premier)"""
+    try:
+        with open(_log_path(), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return []
+
+
+def store_course(course_entry):
+    """Stocke une version de cours et retourne son hash.
+
+    Tous les champs de l'entrée sont conservés, dans leur ordre d'origine
+    (liste de paires) ; seules les définitions sont remplacées par leurs hash.
+    """
+    course_version = {'fields': [
+        [field, [put_object(d) for d in value] if field == 'definitions' else value]
+        for field, value in course_entry.items()
+    ]}
+    return put_object(course_version)
+
+
+def _course_metadata(course_version):
+    """Champs d'une version de cours autres que les définitions"""
+    return {field: value for field, value in course_version['fields'] if field != 'definitions'}
+
+
+def _course_definitions(course_version):
+    """Hash des définitions d'une version de cours"""
+    return dict(course_version['fields']).get('definitions', [])
+
+
+def load_course(course_hash):
+    """Reconstruit une entrée de cours complète à partir du hash de sa version"""
+    return {
+        field: [get_object(h) for h in value] if field == 'definitions' else value
+        for field, value in get_object(course_hash)['fields']
+    }
+
+
+def record_version(json_data, message=''):
+    """Enregistre l'état courant du corpus.
+
+    Chaque version reçoit un numéro croissant et pointe vers le hash de son
+    manifeste. Une restauration vers un état antérieur crée donc une nouvelle
+    version (nouveau numéro) dont le manifeste est identique à une ancienne.
+    Ne crée pas de version si le corpus n'a pas changé depuis la dernière.
+    Retourne le numéro de la version.
+    """
+    with _lock:
+        manifest = {
+            'courses': [[course[0], store_course(course[1])] for course in json_data['courses']]
+        }
+        manifest_hash = put_object(manifest)
+
+        log = read_log()
+        if log and log[-1]['manifest'] == manifest_hash:
+            return log[-1]['version']
+
+        version = log[-1]['version'] + 1 if log else 1
+        log.append({
+            'version': version,
+            'manifest': manifest_hash,
+            'date': datetime.now().isoformat(),
+            'message': message,
+            'totalCourses': len(manifest['courses'])
+        })
+        _write_atomic(_log_path(), json.dumps(log, ensure_ascii=False, indent=2))
+        return version
+
+
+def resolve_version(version_ref):
+    """Retrouve l'entrée du journal correspondant à un numéro de version"""
+    try:
+        version = int(version_ref)
+    except (TypeError, ValueError):
+        return None
+    for entry in read_log():
+        if entry['version'] == version:
+            return entry
+    return None
+
+
+def get_manifest(manifest_hash):
+    """Retourne un manifeste sous forme de dictionnaire {clé: hash du cours}"""
+    return dict(get_object(manifest_hash)['courses'])
+
+
+def _definition_key(definition):
+    return definition.get('term', '').strip().lower()
+
+
+def _multiset_difference(hashes, other_hashes):
+    """Hash de `hashes` absents de `other_hashes`, en tenant compte des doublons"""
+    remaining = Counter(other_hashes)
+    difference = []
+    for obj_hash in hashes:
+        if remaining[obj_hash]:
+            remaining[obj_hash] -= 1
+        else:
+            difference.append(obj_hash)
+    return difference
+
+
+def diff_courses(old_hash, new_hash):
+    """Compare deux versions d'un même cours, définition par définition"""
+    old_version = get_object(old_hash)
+    new_version = get_object(new_hash)
+
+    old_metadata = _course_metadata(old_version)
+    new_metadata = _course_metadata(new_version)
+    metadata_changes = {
+        field: {'from': old_metadata.get(field, ''), 'to': new_metadata.get(field, '')}
+        for field in list(old_metadata) + [f for f in new_metadata if f not in old_metadata]
+        if old_metadata.get(field, '') != new_metadata.get(field, '')
+    }
+
+    old_definitions = _course_definitions(old_version)
+    new_definitions = _course_definitions(new_version)
+    removed = [get_object(h) for h in _multiset_difference(old_definitions, new_definitions)]
+    added = [get_object(h) for h in _multiset_difference(new_definitions, old_definitions)]
+
+    # Une définition dont seul le texte a changé apparaît comme modifiée ;
+    # un même terme peut apparaître plusieurs fois, les paires suivent l'ordre du cours
+    removed_by_term = defaultdict(list)
+    for definition in removed:
+        removed_by_term[_definition_key(definition)].append(definition)
+    modified = []
+    still_added = []
+    for definition in added:
+        candidates = removed_by_term.get(_definition_key(definition))
+        if candidates:
+            previous = candidates.pop(0)
+            modified.append({'term': definition.get('term', ''),
+                             'from': previous.get('definition', ''),
+                             'to': definition.get('definition', '')})
+        else:
+            still_added.append(definition)
+
+    return {
+        'metadata': metadata_changes,
+        'added': still_added,
+        'removed': [d for candidates in removed_by_term.values() for d in candidates],
+        'modified': modified
+    }
+
+
+def diff_versions(old_entry, new_entry):
+    """Compare deux versions du corpus (entrées du journal)"""
+    old_manifest = get_manifest(old_entry['manifest'])
+    new_manifest = get_manifest(new_entry['manifest'])
+
+    added = [key for key in new_manifest if key not in old_manifest]
+    removed = [key for key in old_manifest if key not in new_manifest]
+    modified = {
+        key: diff_courses(old_manifest[key], new_manifest[key])
+        for key in new_manifest
+        if key in old_manifest and old_manifest[key] != new_manifest[key]
+    }
+
+    return {
+        'from': old_entry['version'],
+        'to': new_entry['version'],
+        'addedCourses': added,
+        'removedCourses': removed,
+        'modifiedCourses': modified
+    }
+
+
+def course_history(course_key):
+    """Liste les versions du corpus dans lesquelles un cours a changé"""
+    history = []
+    previous_hash = None
+    for entry in read_log():
+        course_hash = get_manifest(entry['manifest']).get(course_key)
+        if course_hash is not None and course_hash != previous_hash:
+            history.append({
+                'version': entry['version'],
+                'date': entry['date'],
+                'message': entry['message'],
+                'courseHash': course_hash,
+                'definitions_count': len(_course_definitions(get_object(course_hash)))
+            })
+        previous_hash = course_hash
+    return history
@@ -0,0 +1,161 @@
+"""Test de charge des endpoints /api/stats et /api/extract_odt.
+
+Envoie des requêtes depuis plusieurs threads clients et affiche, pour chaque
+endpoint, le débit (requêtes/s) et les latences p50/p99. Lancer le script
+contre le serveur de développement (`python app.py`) puis contre le serveur
+de production (`python serve.py`) pour comparer.
+
+Usage : python loadtest.py [--url http://localhost:5000] [--clients 8] [--duration 10] [--odt cours.odt]
+"""
+
+import argparse
+import http.client
+import io
+import threading
+import time
+import uuid
+import zipfile
+from urllib.parse import urlsplit
+
+ODT_CONTENT = """<?xml version="1.0" encoding="UTF-8"?>
+<office:document-content xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0"
+    xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0" office:version="1.2">
+<office:body><office:text>
+<text:p>UE 2.2.S1</text:p>
+<text:p>titre : Cours de test de charge</text:p>
+<text:p>auteur : loadtest</text:p>
+<text:p>01/01/2025</text:p>
+<text:p>========</text:p>
+{definitions}
+</office:text></office:body>
+</office:document-content>
+"""
+
+ODT_MANIFEST = """<?xml version="1.0" encoding="UTF-8"?>
+<manifest:manifest xmlns:manifest="urn:oasis:names:tc:opendocument:xmlns:manifest:1.0" manifest:version="1.2">
+<manifest:file-entry manifest:full-path="/" manifest:media-type="application/vnd.oasis.opendocument.text"/>
+<manifest:file-entry manifest:full-path="content.xml" manifest:media-type="text/xml"/>
+</manifest:manifest>
+"""
+
+
+def build_odt(nb_definitions=30):
+    """Construit en mémoire un fichier ODT minimal au format attendu par l'application"""
+    definitions = '\n'.join(
+        f"<text:p>{i}. Terme {i} : Définition du terme numéro {i}</text:p>"
+        for i in range(1, nb_definitions + 1)
+    )
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as odt:
+        odt.writestr('mimetype', 'application/vnd.oasis.opendocument.text', compress_type=zipfile.ZIP_STORED)
+        odt.writestr('content.xml', ODT_CONTENT.format(definitions=definitions), compress_type=zipfile.ZIP_DEFLATED)
+        odt.writestr('META-INF/manifest.xml', ODT_MANIFEST, compress_type=zipfile.ZIP_DEFLATED)
+    return buffer.getvalue()
+
+
+def multipart_body(filename, payload):
+    """Encode un fichier en multipart/form-data (champ 'file')"""
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        "Content-Type: application/vnd.oasis.opendocument.text\r\n\r\n"
+    ).encode('utf-8') + payload + f"\r\n--{boundary}--\r\n".encode('utf-8')
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def run_scenario(url, clients, duration, method, path, body=None, content_type=None):
+    """Envoie des requêtes en boucle pendant `duration` secondes et retourne les mesures
+
+    Req/s et latences ne portent que sur les réponses réussies ; les échecs
+    sont comptés à part dans `errors`.
+    """
+    target = urlsplit(url)
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client():
+        local_latencies = []
+        local_errors = 0
+        connection = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+        headers = {'Content-Type': content_type} if content_type else {}
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                # Seules les réponses réussies comptent dans les latences : une erreur
+                # (connexion refusée, 5xx) est souvent bien plus rapide qu'une vraie réponse
+                if response.status >= 400:
+                    local_errors += 1
+                else:
+                    local_latencies.append(time.perf_counter() - start)
+                if response.getheader('Connection', '').lower() == 'close' or response.version == 10:
+                    connection.close()
+            except (OSError, http.client.HTTPException):
+                local_errors += 1
+                connection.close()
+                connection = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+        connection.close()
+        with lock:
+            latencies.extend(local_latencies)
+            errors[0] += local_errors
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50': percentile(latencies, 50) * 1000,
+        'p99': percentile(latencies, 99) * 1000
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Test de charge du serveur IFSI Lannion")
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--clients', type=int, default=8, help="nombre de clients simultanés")
+    parser.add_argument('--duration', type=float, default=10, help="durée de chaque scénario, en secondes")
+    parser.add_argument('--odt', help="fichier ODT à envoyer (par défaut un fichier généré)")
+    args = parser.parse_args(argv)
+
+    if args.odt:
+        with open(args.odt, 'rb') as f:
+            payload = f.read()
+    else:
+        payload = build_odt()
+    upload_body, upload_type = multipart_body('loadtest.odt', payload)
+
+    scenarios = [
+        ('GET /api/stats', 'GET', '/api/stats', None, None),
+        ('POST /api/extract_odt', 'POST', '/api/extract_odt', upload_body, upload_type),
+    ]
+
+    print(f"Cible : {args.url} — {args.clients} clients, {args.duration:g} s par scénario")
+    print(f"{'Endpoint':<24}{'Réussies':>10}{'Erreurs':>9}{'Req/s':>10}{'p50 (ms)':>11}{'p99 (ms)':>11}")
+    for name, method, path, body, content_type in scenarios:
+        result = run_scenario(args.url, args.clients, args.duration, method, path, body, content_type)
+        print(f"{name:<24}{result['requests']:>10}{result['errors']:>9}{result['rps']:>10.1f}"
+              f"{result['p50']:>11.2f}{result['p99']:>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+"""Lancement du serveur en mode production.
+
+Contrairement à `python app.py` (serveur de développement Flask, debug et
+rechargement automatique), ce script :
+- charge et indexe le fichier JSON avant d'accepter des requêtes ;
+- sert l'application avec un pool de threads (waitress si installé,
+  sinon un serveur WSGI de la bibliothèque standard) ;
+- s'arrête proprement sur Ctrl+C ou SIGTERM : les nouvelles écritures sont
+  refusées (503) et l'écriture en cours se termine avant la sortie.
+
+Usage : python serve.py [--host 0.0.0.0] [--port 5000] [--threads 8] [--timeout 30]
+Les mêmes réglages peuvent être donnés par les variables d'environnement
+IFSI_HOST, IFSI_PORT, IFSI_THREADS et IFSI_TIMEOUT.
+"""
+
+import argparse
+import os
+import signal
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.simple_server import WSGIServer, WSGIRequestHandler, make_server
+
+import app as ifsi_app
+
+# Essayer d'importer waitress (serveur WSGI multi-threadé en pur Python)
+try:
+    import waitress
+    HAS_WAITRESS = True
+except ImportError:
+    HAS_WAITRESS = False
+
+
+class PooledWSGIServer(WSGIServer):
+    """Serveur WSGI standard dont les requêtes sont traitées par un pool de threads"""
+
+    threads = 8
+
+    def server_activate(self):
+        super().server_activate()
+        self.executor = ThreadPoolExecutor(max_workers=self.threads)
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        # Attendre la fin des requêtes en cours
+        self.executor.shutdown(wait=True)
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    """Gestionnaire de requêtes sans journal d'accès (coûteux sous charge)"""
+
+    def log_message(self, format, *args):
+        pass
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serveur IFSI Lannion (production)")
+    parser.add_argument('--host', default=os.environ.get('IFSI_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('IFSI_PORT', 5000)))
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('IFSI_THREADS', 8)),
+                        help="nombre de threads traitant les requêtes")
+    parser.add_argument('--timeout', type=int, default=int(os.environ.get('IFSI_TIMEOUT', 30)),
+                        help="délai d'inactivité d'une connexion, en secondes")
+    parser.add_argument('--stdlib', action='store_true',
+                        help="utiliser le serveur de la bibliothèque standard même si waitress est installé")
+    return parser.parse_args(argv)
+
+
+def handle_shutdown_signal(signum, frame):
+    """Bloque les écritures avant d'arrêter le pool de threads, puis quitte"""
+    ifsi_app.stop_writes()
+    sys.exit(0)
+
+
+def run_waitress(args):
+    server = waitress.create_server(
+        ifsi_app.app,
+        host=args.host,
+        port=args.port,
+        threads=args.threads,
+        channel_timeout=args.timeout
+    )
+    # run() intercepte SystemExit/KeyboardInterrupt et arrête le pool de threads
+    server.run()
+    server.close()
+
+
+def run_stdlib(args):
+    PooledWSGIServer.threads = args.threads
+    QuietRequestHandler.timeout = args.timeout
+    server = make_server(args.host, args.port, ifsi_app.app,
+                         server_class=PooledWSGIServer, handler_class=QuietRequestHandler)
+    try:
+        server.serve_forever()
+    except (SystemExit, KeyboardInterrupt):
+        pass
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # Ctrl+C et SIGTERM (arrêt par le système) suivent le même chemin
+    signal.signal(signal.SIGINT, handle_shutdown_signal)
+    signal.signal(signal.SIGTERM, handle_shutdown_signal)
+
+    print("📁 Chargement du fichier JSON:", ifsi_app.JSON_FILE_PATH)
+    stats = ifsi_app.preload_store()['stats']
+    print(f"📚 {stats['totalCourses']} cours, {stats['totalTerms']} termes indexés")
+
+    backend = 'waitress' if HAS_WAITRESS and not args.stdlib else 'wsgiref'
+    print(f"🚀 Serveur IFSI Lannion ({backend}, {args.threads} threads) démarré sur "
+          f"http://{args.host}:{args.port}")
+
+    try:
+        if backend == 'waitress':
+            run_waitress(args)
+        else:
+            run_stdlib(args)
+    finally:
+        # Toutes les écritures (JSON puis historique) se font sous store_lock,
+        # gardé jusqu'à la sortie : un thread encore vivant ne peut plus en commencer
+        ifsi_app.stop_writes()
+        print("🛑 Serveur arrêté")
+
+
+if __name__ == '__main__':
+    main()
@@ -3,7 +3,7 @@ echo ========================================
 echo    IFSI Lannion 2025 - Upload Interface
 echo ========================================
 echo.
-echo Demarrage du serveur...
+echo Demarrage du serveur (mode production)...
 echo.
 
 REM Verifier si Python est installe
@@ -27,6 +27,6 @@ echo Appuyez sur Ctrl+C pour arreter
 echo ========================================
 echo.
 
-python app.py
+python serve.py
 
 pause
\ No newline at end of file
@@ -0,0 +1,164 @@
+import io
+import json
+import os
+import tempfile
+import threading
+
+import pytest
+
+import app
+from loadtest import build_odt
+
+
+def temp_files(directory):
+    return [name for name in os.listdir(directory) if name.startswith('temp_')]
+
+
+def test_health(client):
+    response = client.get('/api/health')
+    assert response.status_code == 200
+    assert response.get_json() == {'status': 'ok'}
+
+
+def test_ready_loads_store_on_first_probe(client):
+    app.reset_store()
+    assert not app.is_store_ready()
+
+    response = client.get('/api/ready')
+    assert response.status_code == 200
+    assert response.get_json()['totalCourses'] == 16
+    assert app.is_store_ready()
+
+
+def test_ready_while_loading(client):
+    app.reset_store()
+    locked = threading.Event()
+    release = threading.Event()
+
+    def hold_lock():
+        with app.store_lock:
+            locked.set()
+            release.wait()
+
+    thread = threading.Thread(target=hold_lock)
+    thread.start()
+    locked.wait()
+    try:
+        response = client.get('/api/ready')
+        assert response.status_code == 503
+        assert response.get_json()['status'] == 'loading'
+    finally:
+        release.set()
+        thread.join()
+
+
+def test_ready_reports_load_failure(client, monkeypatch):
+    app.reset_store()
+
+    def broken_read():
+        raise OSError('disque indisponible')
+
+    with monkeypatch.context() as patch:
+        patch.setattr(app, 'read_json_file', broken_read)
+        response = client.get('/api/ready')
+        assert response.status_code == 503
+        assert response.get_json()['status'] == 'error'
+
+    # La sonde suivante retente le chargement
+    assert client.get('/api/ready').status_code == 200
+
+
+def test_stats_reload_after_external_edit(client):
+    assert client.get('/api/stats').get_json()['totalCourses'] == 16
+
+    with open(app.JSON_FILE_PATH, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    data['courses'] = data['courses'][:3]
+    with open(app.JSON_FILE_PATH, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    # Garantir un mtime différent même sur un système de fichiers peu précis
+    mtime = os.path.getmtime(app.JSON_FILE_PATH) + 10
+    os.utime(app.JSON_FILE_PATH, (mtime, mtime))
+
+    assert client.get('/api/stats').get_json()['totalCourses'] == 3
+
+
+def test_write_json_file_leaves_no_temp_file(client, tmp_path):
+    data = app.read_store_copy()
+    data['stats']['studiedTerms'] = 42
+    app.write_json_file(data)
+
+    assert temp_files(tmp_path) == []
+    assert client.get('/api/stats').get_json()['studiedTerms'] == 42
+
+
+def test_write_json_file_retries_on_permission_error(client, tmp_path, monkeypatch):
+    real_replace = os.replace
+    calls = []
+
+    def locked_twice(src, dst):
+        calls.append(src)
+        if len(calls) < 3:
+            raise PermissionError('fichier ouvert')
+        return real_replace(src, dst)
+
+    monkeypatch.setattr(os, 'replace', locked_twice)
+    monkeypatch.setattr(app.time, 'sleep', lambda delay: None)
+    data = app.read_store_copy()
+    data['stats']['studiedTerms'] = 7
+    app.write_json_file(data)
+
+    assert len(calls) == 3
+    assert temp_files(tmp_path) == []
+    with open(app.JSON_FILE_PATH, 'r', encoding='utf-8') as f:
+        assert json.load(f)['stats']['studiedTerms'] == 7
+
+
+def test_write_json_file_gives_up_without_leaving_temp_file(client, tmp_path, monkeypatch):
+    with open(app.JSON_FILE_PATH, 'rb') as f:
+        original = f.read()
+
+    def always_locked(src, dst):
+        raise PermissionError('fichier ouvert')
+
+    monkeypatch.setattr(os, 'replace', always_locked)
+    monkeypatch.setattr(app.time, 'sleep', lambda delay: None)
+    with pytest.raises(PermissionError):
+        app.write_json_file(app.read_store_copy())
+
+    assert temp_files(tmp_path) == []
+    with open(app.JSON_FILE_PATH, 'rb') as f:
+        assert f.read() == original
+
+
+def test_extract_odt_uses_unique_temp_files(client, monkeypatch):
+    real_mkstemp = tempfile.mkstemp
+    paths = []
+
+    def recording_mkstemp(*args, **kwargs):
+        fd, path = real_mkstemp(*args, **kwargs)
+        paths.append(path)
+        return fd, path
+
+    monkeypatch.setattr(tempfile, 'mkstemp', recording_mkstemp)
+    payload = build_odt(3)
+    for _ in range(2):
+        response = client.post('/api/extract_odt', data={'file': (io.BytesIO(payload), 'cours.odt')},
+                               content_type='multipart/form-data')
+        assert response.status_code == 200
+        assert response.get_json()['metadata']['title'] == 'Cours de test de charge'
+
+    assert len(set(paths)) == 2
+    assert all('cours.odt' not in path for path in paths)
+    assert not any(os.path.exists(path) for path in paths)
+    assert not os.path.exists('temp_cours.odt')
+
+
+def test_writes_refused_after_stop(client, monkeypatch):
+    monkeypatch.setattr(app, '_writes_stopped', threading.Event())
+    app.stop_writes()
+    try:
+        response = client.post('/api/add_course', json={'metadata': {'title': 'X'}, 'definitions': []})
+        assert response.status_code == 503
+    finally:
+        app.store_lock.release()
@@ -0,0 +1,180 @@
+import copy
+import json
+
+import app
+import history
+
+DUPLICATE_TERMS_COURSE = 'ue_2_2_s1_molcules_constitutives_du_vivant'
+
+
+def get_course(json_data, course_key):
+    return next(course[1] for course in json_data['courses'] if course[0] == course_key)
+
+
+def pack_lines():
+    with open(history._pack_path(), 'rb') as f:
+        return f.read().splitlines()
+
+
+def test_identical_definitions_are_stored_once(corpus):
+    history.record_version(corpus, 'init')
+    lines_before = len(pack_lines())
+
+    # Copier une définition existante dans un autre cours n'ajoute pas d'objet définition
+    updated = copy.deepcopy(corpus)
+    shared = copy.deepcopy(updated['courses'][0][1]['definitions'][0])
+    updated['courses'][1][1]['definitions'].append(shared)
+    history.record_version(updated, 'copie')
+
+    # Seuls la nouvelle version du cours et le nouveau manifeste sont ajoutés
+    assert len(pack_lines()) == lines_before + 2
+    hashes = [line[:history.HASH_LENGTH] for line in pack_lines()]
+    assert len(hashes) == len(set(hashes))
+
+
+def test_unchanged_corpus_does_not_create_a_version(corpus):
+    assert history.record_version(corpus, 'init') == 1
+    assert history.record_version(copy.deepcopy(corpus), 'identique') == 1
+    assert len(history.read_log()) == 1
+
+
+def test_update_then_diff(corpus):
+    history.record_version(corpus, 'init')
+    updated = copy.deepcopy(corpus)
+    course_key, course = updated['courses'][0]
+    course['definitions'][0]['definition'] += ' (modifié)'
+    course['definitions'].append({'term': 'Nouveau terme', 'definition': 'Nouvelle définition'})
+    removed = course['definitions'].pop(1)
+    updated['courses'].pop()
+    history.record_version(updated, 'mise à jour')
+
+    diff = history.diff_versions(history.resolve_version(1), history.resolve_version(2))
+
+    assert diff['from'] == 1 and diff['to'] == 2
+    assert diff['addedCourses'] == []
+    assert diff['removedCourses'] == [corpus['courses'][-1][0]]
+    assert list(diff['modifiedCourses']) == [course_key]
+    course_diff = diff['modifiedCourses'][course_key]
+    assert course_diff['added'] == [{'term': 'Nouveau terme', 'definition': 'Nouvelle définition'}]
+    assert course_diff['removed'] == [removed]
+    assert [m['term'] for m in course_diff['modified']] == [course['definitions'][0]['term']]
+    assert course_diff['metadata'] == {}
+
+
+def test_course_fields_and_order_are_preserved(corpus):
+    course = {'title': 'Cours', 'extra': {'notes': [1, 2]}, 'definitions': [{'term': 'A', 'definition': 'B'}],
+              'ue': '1.1.S1', 'filename': 'Cours.odt'}
+    course_hash = history.store_course(course)
+    restored = history.load_course(course_hash)
+    assert restored == course
+    assert list(restored) == list(course)
+
+    # Un changement d'un champ quelconque crée une nouvelle version du cours
+    changed = dict(course, extra={'notes': [1, 2, 3]})
+    assert history.store_course(changed) != course_hash
+    assert history.diff_courses(course_hash, history.store_course(changed))['metadata'] == {
+        'extra': {'from': {'notes': [1, 2]}, 'to': {'notes': [1, 2, 3]}}
+    }
+
+
+def test_duplicate_terms_are_paired_in_order(corpus):
+    history.record_version(corpus, 'init')
+    course = get_course(corpus, DUPLICATE_TERMS_COURSE)
+    terms = [d['term'].lower() for d in course['definitions']]
+    duplicated = next(term for term in terms if terms.count(term) > 1)
+    originals = [d['definition'] for d in course['definitions'] if d['term'].lower() == duplicated]
+
+    updated = copy.deepcopy(corpus)
+    for definition in get_course(updated, DUPLICATE_TERMS_COURSE)['definitions']:
+        if definition['term'].lower() == duplicated:
+            definition['definition'] += ' (b)'
+    history.record_version(updated, 'mise à jour')
+
+    course_diff = history.diff_versions(history.resolve_version(1), history.resolve_version(2))['modifiedCourses'][DUPLICATE_TERMS_COURSE]
+    assert [(m['from'], m['to']) for m in course_diff['modified']] == [(d, d + ' (b)') for d in originals]
+    assert course_diff['added'] == []
+    assert course_diff['removed'] == []
+
+
+def test_duplicated_definition_appears_in_diff(corpus):
+    history.record_version(corpus, 'init')
+    updated = copy.deepcopy(corpus)
+    course_key, course = updated['courses'][0]
+    course['definitions'].append(copy.deepcopy(course['definitions'][0]))
+    history.record_version(updated, 'doublon')
+
+    course_diff = history.diff_versions(history.resolve_version(1), history.resolve_version(2))['modifiedCourses'][course_key]
+    assert course_diff['added'] == [course['definitions'][0]]
+
+
+def test_restore_round_trip(corpus):
+    history.record_version(corpus, 'init')
+    course_key, original = corpus['courses'][0]
+
+    updated = copy.deepcopy(corpus)
+    updated['courses'][0][1]['definitions'] = []
+    updated['courses'][0][1]['title'] = 'Titre modifié'
+    history.record_version(updated, 'mise à jour')
+
+    manifest = history.get_manifest(history.resolve_version(1)['manifest'])
+    assert history.load_course(manifest[course_key]) == original
+
+    # Revenir à l'état initial crée une nouvelle version qui pointe vers le même manifeste
+    assert history.record_version(corpus, 'restauration') == 3
+    log = history.read_log()
+    assert [entry['version'] for entry in log] == [1, 2, 3]
+    assert log[2]['manifest'] == log[0]['manifest']
+    assert [entry['version'] for entry in history.course_history(course_key)] == [1, 2, 3]
+
+
+def test_interrupted_write_is_ignored(corpus):
+    history.record_version(corpus, 'init')
+    with open(history._pack_path(), 'ab') as f:
+        f.write(b'0' * history.HASH_LENGTH + b' {"incomplet"')
+    history.reset_index()
+
+    updated = copy.deepcopy(corpus)
+    updated['courses'][0][1]['definitions'][0]['definition'] = 'Texte corrigé'
+    history.record_version(updated, 'mise à jour')
+
+    history.reset_index()
+    manifest = history.get_manifest(history.resolve_version(2)['manifest'])
+    assert history.load_course(manifest[updated['courses'][0][0]]) == updated['courses'][0][1]
+    assert all(line.endswith(b'}') or line.endswith(b']') for line in pack_lines())
+
+
+def test_endpoints_add_update_diff_restore(client):
+    metadata = {'ue': '9.9', 'title': 'Cours Test', 'author': 'test', 'date': '01/01/2025'}
+    definitions = [{'term': 'A', 'definition': 'Première'}, {'term': 'B', 'definition': 'Seconde'}]
+    response = client.post('/api/add_course', json={'metadata': metadata, 'definitions': definitions})
+    assert response.status_code == 200
+    old_key = response.get_json()['courseKey']
+    total_courses = response.get_json()['totalCourses']
+
+    # Changer l'UE change la clé du cours
+    updated = [{'term': 'A', 'definition': 'Corrigée'}, definitions[1]]
+    response = client.post('/api/update_course',
+                           json={'metadata': dict(metadata, ue='9.8'), 'definitions': updated})
+    assert response.status_code == 200
+    new_key = response.get_json()['courseKey']
+    assert new_key != old_key
+    update_version = response.get_json()['version']
+
+    versions = client.get('/api/history').get_json()['versions']
+    assert [v['version'] for v in versions] == [3, 2, 1]
+    diff = client.get(f'/api/history/diff?from=2&to={update_version}').get_json()
+    assert diff['addedCourses'] == [new_key]
+    assert diff['removedCourses'] == [old_key]
+
+    response = client.post('/api/history/restore', json={'courseKey': old_key, 'version': 2})
+    assert response.status_code == 200
+    assert response.get_json()['totalCourses'] == total_courses
+
+    with open(app.JSON_FILE_PATH, 'r', encoding='utf-8') as f:
+        courses = json.load(f)['courses']
+    assert [course[0] for course in courses].count(old_key) == 1
+    assert new_key not in [course[0] for course in courses]
+    assert [course[1]['title'] for course in courses].count('Cours Test') == 1
+    assert get_course({'courses': courses}, old_key)['definitions'] == definitions
+
+    assert client.post('/api/history/restore', json={'courseKey': old_key, 'version': 99}).status_code == 404